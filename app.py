@@ -1,22 +1,39 @@
 import streamlit as st
-import pandas as pd
 import os
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+import orjson
 import uuid
+import gzip
+import string
+import hashlib
+import sqlite3
+import threading
+from blake3 import blake3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import openai
 import logging
 from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict
+
+@st.cache_resource(show_spinner=False)
+def init_logging():
+    """Configure logging once per process rather than on every rerun"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO)
+
+    # Suppress Streamlit warnings when run in bare mode
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    logging.getLogger('streamlit.runtime.state.session_state_proxy').setLevel(logging.ERROR)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+init_logging()
 logger = logging.getLogger(__name__)
 
-# Suppress Streamlit warnings when run in bare mode
-logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
-logging.getLogger('streamlit.runtime.state.session_state_proxy').setLevel(logging.ERROR)
-
 load_dotenv()
 
 # Page config for modern look
@@ -30,103 +47,470 @@ st.set_page_config(
 # MCP Server URL - Updated to use enhanced server
 MCP_SERVER_URL = "http://localhost:8000"
 
-# Initialize OpenAI client
-openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Header for request bodies serialized with orjson
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# JSON request bodies larger than this are gzip-compressed before sending
+GZIP_MIN_BYTES = 1024
+
+# Tabular query_data results are requested as Arrow IPC; only a preview goes into the LLM prompt
+ARROW_STREAM_MIME = "application/vnd.apache.arrow.stream"
+ARROW_PREVIEW_ROWS = 20
+
+# Files larger than this are streamed into the multipart body instead of copied
+STREAMING_UPLOAD_THRESHOLD = 4 * 1024 * 1024
+
+# Maximum number of files uploaded in parallel
+MAX_UPLOAD_WORKERS = 4
+
+# Source info fields that differ on every query, kept out of answer prompts and cache keys
+PER_QUERY_SOURCE_FIELDS = {"query_id", "timestamp"}
+
+# Read-only per-file MCP tools whose results can be reused while the file contents are unchanged.
+# list_files is not cached: it covers every file on the server, including other sessions' uploads.
+CACHEABLE_TOOLS = {"describe_file", "get_columns"}
+
+# Local SQLite store for chat history and the number of recent turns kept in memory
+CHAT_DB_PATH = "chat_history.db"
+CHAT_HISTORY_WINDOW = 20
+
+# Number of new turns after which older history is folded into the rolling summary
+HISTORY_SUMMARY_INTERVAL = 5
+
+# Maximum number of OpenAI responses kept in the per-session exact-match cache
+RESPONSE_CACHE_SIZE = 512
+
+class ToolParameters(BaseModel):
+    """Arguments the router may fill in for an MCP tool call"""
+    model_config = ConfigDict(extra="forbid")
+
+    filename: Optional[str]
+    operation: Optional[Literal["execute", "head", "count", "average", "sum", "describe"]]
+    code: Optional[str]
+    column: Optional[str]
+    n: Optional[int]
+
+class ToolCall(BaseModel):
+    """Structured routing decision returned by the router model"""
+    model_config = ConfigDict(extra="forbid")
+
+    tool: Literal["list_files", "get_columns", "describe_file", "query_data"]
+    parameters: ToolParameters
+
+# Router prompts, built once at import so every call sends a byte-identical prefix
+ROUTER_SYSTEM_PROMPT = """You are an AI that analyzes questions about data and generates MCP tool calls.
+
+Available MCP tools:
+- list_files: List all uploaded CSV/Excel files with their columns
+- get_columns: Return all column names for a file
+- describe_file: Provide statistics (row count, column count, data types) for a file
+- query_data: Query a file with an operation (execute, head, count, average, sum, describe); execute evaluates a pandas expression in code against df, head returns n rows, average and sum use column
+
+For most data questions, use query_data with operation="execute" and code containing a pandas expression to evaluate on df, e.g. df['total_runs'].mean(). Set unused parameters to null."""
+
+# Stable content (files and rules) comes first so OpenAI's prompt prefix cache can be reused
+ROUTER_USER_TEMPLATE = string.Template("""Available Files and Columns:
+$files_context
+
+IMPORTANT: You must use these EXACT column names in your pandas code. Do not invent or guess column names.
+Use context from recent conversation history to understand references to previous answers, entities, or data.
+
+${chat_history_context}Question: $question
+""")
+
+# Structured output schema so the router always returns a parseable ToolCall
+ROUTER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "ToolCall", "schema": ToolCall.model_json_schema(), "strict": True}
+}
+
+@st.cache_resource
+def get_http_session():
+    """Create a pooled HTTP session shared across Streamlit reruns"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    return session
+
+# Keep-alive session for all MCP server calls
+SESSION = get_http_session()
+
+@st.cache_resource
+def get_openai_client():
+    """Create an OpenAI client with a pooled HTTP/2 transport shared across reruns"""
+    # Imported here so cold starts only pay for openai/httpx when a client is first needed
+    import httpx
+    import openai
+
+    return openai.OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.Client(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+        )
+    )
+
+@st.cache_resource
+def get_background_executor():
+    """Thread pool for OpenAI work that should not block the current rerun"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource
+def get_chat_store():
+    """Open the local chat history store shared across reruns and sessions"""
+    con = sqlite3.connect(CHAT_DB_PATH, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE IF NOT EXISTS chat_history (session_id TEXT, ts TEXT, question TEXT, response TEXT, source_info TEXT)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history (session_id, ts)")
+    con.commit()
+    return con
+
+@st.cache_resource
+def get_chat_store_lock():
+    """Serialize access to the shared SQLite connection across Streamlit sessions"""
+    return threading.Lock()
 
 # Initialize session state for enhanced features
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
     st.session_state.chat_history = []
-    st.session_state.uploaded_files = []
+    st.session_state.files = {"filename": [], "size": [], "row_count": [], "columns": []}
+    st.session_state.files_markdown = ""
+    st.session_state.files_context = "{}"
     st.session_state.source_tracking = {}
+    st.session_state.response_cache = OrderedDict()
+    st.session_state.file_hashes = {}
+    st.session_state.tool_cache = {}
+    st.session_state.history_summary = ""
+    st.session_state.summary_future = None
+    st.session_state.turns_since_summary = 0
+    st.session_state.query_counter = 0
 
 st.title("🚀 Enhanced MCP Data Assistant with Multi-File Support")
 
 st.markdown("Upload multiple CSV/Excel files, maintain chat history, and get source attribution for all your data queries.")
 
+def arrow_result_to_mcp(content):
+    """Decode an Arrow IPC query result into the usual MCP result shape with a row preview"""
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(content).read_all()
+    source_info = orjson.loads((table.schema.metadata or {}).get(b"source_info", b"{}"))
+    text = str(table.slice(0, ARROW_PREVIEW_ROWS).to_pylist())
+    if table.num_rows > ARROW_PREVIEW_ROWS:
+        text += f" ... ({table.num_rows:,} rows total)"
+    return {"content": [{"type": "text", "text": text}], "source_info": source_info}
+
+def encode_json_body(payload, headers=JSON_HEADERS):
+    """Serialize a JSON request body, gzip-compressing it when it is large enough to pay off"""
+    body = orjson.dumps(payload)
+    if len(body) > GZIP_MIN_BYTES:
+        return gzip.compress(body), {**headers, "Content-Encoding": "gzip"}
+    return body, headers
+
 def call_mcp_tool(tool_name, **kwargs):
     """Call an MCP tool and return the result with source tracking"""
     try:
-        logger.info(f"Calling MCP tool: {tool_name} with args: {kwargs}")
-        response = requests.post(
+        logger.info("Calling MCP tool: %s with args: %s", tool_name, kwargs)
+        headers = JSON_HEADERS
+        if tool_name == "query_data":
+            headers = {**JSON_HEADERS, "Accept": f"{ARROW_STREAM_MIME}, application/json"}
+
+        body, headers = encode_json_body(kwargs, headers)
+        response = SESSION.post(
             f"{MCP_SERVER_URL}/tools/{tool_name}",
-            json=kwargs,
-            headers={"Content-Type": "application/json"}
+            data=body,
+            headers=headers
         )
         
         # Log the response status
-        logger.info(f"MCP Response Status: {response.status_code}")
+        logger.info("MCP Response Status: %s", response.status_code)
         
         if response.status_code != 200:
             error_detail = response.text
-            logger.error(f"MCP Error: {error_detail}")
+            logger.error("MCP Error: %s", error_detail)
             return {"error": f"❌ Error calling MCP tool {tool_name} (Status {response.status_code}): {error_detail}"}
         
-        result = response.json()
-        logger.info(f"MCP Response: {result}")
+        if response.headers.get("Content-Type", "").startswith(ARROW_STREAM_MIME):
+            result = arrow_result_to_mcp(response.content)
+        else:
+            result = orjson.loads(response.content)
+        logger.info("MCP Response: %s", result)
 
         return result
     except Exception as e:
-        logger.error(f"Exception calling MCP tool: {str(e)}")
+        logger.error("Exception calling MCP tool: %s", e)
         return {"error": f"❌ Error calling MCP tool {tool_name}: {str(e)}"}
 
-def upload_multiple_files(files, session_id):
-    """Upload multiple files to the server"""
+def hash_file_contents(data):
+    """Return a 16-byte hex content hash using multithreaded SIMD BLAKE3"""
+    return blake3(data, max_threads=blake3.AUTO).hexdigest(length=16)
+
+def tool_cache_key(tool_name, filename):
+    """Key a read-only tool result on the content hash of the file it depends on"""
+    return (tool_name, filename, st.session_state.file_hashes.get(filename))
+
+def call_mcp_tool_cached(tool_name, **kwargs):
+    """Call an MCP tool, reusing cached results for read-only tools on unchanged files"""
+    # Only files this session uploaded have a known content hash to key on
+    if tool_name not in CACHEABLE_TOOLS or kwargs.get("filename") not in st.session_state.file_hashes:
+        return call_mcp_tool(tool_name, **kwargs)
+
+    key = tool_cache_key(tool_name, kwargs.get("filename"))
+    cached = st.session_state.tool_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = call_mcp_tool(tool_name, **kwargs)
+    if "error" not in result:
+        st.session_state.tool_cache[key] = result
+    return result
+
+def call_mcp_tools_batch(calls):
+    """Call several MCP tools in one round-trip; each call is a {"tool", "params"} dict"""
     try:
-        # Prepare files for upload
-        file_list = []
-        for file in files:
-            if file is not None:
-                file_list.append(('files', (file.name, file.getvalue(), file.type)))
-        
-        # Send to upload endpoint
-        response = requests.post(
-            f"{MCP_SERVER_URL}/upload?session_id={session_id}",
-            files=file_list
-        )
+        logger.info("Calling MCP tool batch: %s", [call['tool'] for call in calls])
+        body, headers = encode_json_body(calls)
+        response = SESSION.post(f"{MCP_SERVER_URL}/tools/_batch", data=body, headers=headers)
+
+        if response.status_code != 200:
+            error_detail = response.text
+            logger.error("MCP Batch Error: %s", error_detail)
+            return [{"error": f"❌ Error calling MCP tool batch (Status {response.status_code}): {error_detail}"} for _ in calls]
+
+        return orjson.loads(response.content).get("results", [])
+    except Exception as e:
+        logger.error("Exception calling MCP tool batch: %s", e)
+        return [{"error": f"❌ Error calling MCP tool batch: {str(e)}"} for _ in calls]
+
+def store_uploaded_files(uploaded_files):
+    """Store upload results column-wise and pre-render the file list shown on every rerun"""
+    files = {
+        "filename": [info['filename'] for info in uploaded_files],
+        "size": [info['size'] for info in uploaded_files],
+        "row_count": [info['row_count'] for info in uploaded_files],
+        "columns": [info['columns'] for info in uploaded_files]
+    }
+    st.session_state.files = files
+    st.session_state.files_context = orjson.dumps(
+        dict(zip(files["filename"], files["columns"])), option=orjson.OPT_INDENT_2
+    ).decode()
+    st.session_state.files_markdown = "\n".join(
+        f"- **{filename}** ({row_count:,} rows, {len(columns)} columns)"
+        for filename, row_count, columns in zip(files["filename"], files["row_count"], files["columns"])
+    )
+
+def upload_file(file, session_id):
+    """Upload a single file to the server"""
+    try:
+        upload_url = f"{MCP_SERVER_URL}/upload?session_id={session_id}"
+
+        if file.size > STREAMING_UPLOAD_THRESHOLD:
+            # Stream large files from their buffer rather than copying them into the request body
+            file.seek(0)
+            encoder = MultipartEncoder(fields=[('files', (file.name, file, file.type))])
+            response = SESSION.post(
+                upload_url,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type}
+            )
+        else:
+            response = SESSION.post(upload_url, files=[('files', (file.name, file.getvalue(), file.type))])
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             return result
         else:
-            return {"error": f"Upload failed: {response.text}"}
+            return {"error": f"Upload failed for {file.name}: {response.text}"}
+    except Exception as e:
+        return {"error": f"Upload error for {file.name}: {str(e)}"}
+
+def upload_multiple_files(files, session_id):
+    """Upload multiple files to the server concurrently, one request per file"""
+    files = [file for file in files if file is not None]
+    if not files:
+        return {"error": "No files selected"}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_UPLOAD_WORKERS, len(files))) as executor:
+        results = list(executor.map(lambda file: upload_file(file, session_id), files))
+
+    # Merge the per-file responses into a single upload result
+    errors = [result["error"] for result in results if "error" in result]
+    if errors:
+        return {"error": "\n".join(errors)}
+
+    uploaded_files = [info for result in results for info in result.get("uploaded_files", [])]
+    return {
+        "message": f"Successfully uploaded {len(uploaded_files)} files",
+        "uploaded_files": uploaded_files
+    }
+
+def save_chat_entry(session_id, entry):
+    """Write a chat entry through to the local history store"""
+    try:
+        with get_chat_store_lock(), get_chat_store() as con:
+            con.execute(
+                "INSERT INTO chat_history (session_id, ts, question, response, source_info) VALUES (?, ?, ?, ?, ?)",
+                (session_id, entry['timestamp'], entry['question'], entry['response'], orjson.dumps(entry.get('source_info') or {}).decode())
+            )
+    except Exception as e:
+        logger.error("Error saving chat history: %s", e)
+
+def count_chat_history(session_id):
+    """Count the chat entries stored locally for a session"""
+    try:
+        with get_chat_store_lock():
+            return get_chat_store().execute("SELECT COUNT(*) FROM chat_history WHERE session_id = ?", (session_id,)).fetchone()[0]
     except Exception as e:
-        return {"error": f"Upload error: {str(e)}"}
+        logger.error("Error counting chat history: %s", e)
+        return len(st.session_state.chat_history)
 
 def load_chat_history(session_id):
-    """Load chat history from server"""
+    """Load recent chat history from the local store, falling back to the server"""
+    try:
+        with get_chat_store_lock():
+            rows = get_chat_store().execute(
+                "SELECT ts, question, response, source_info FROM chat_history WHERE session_id = ? ORDER BY ts DESC LIMIT ?",
+                (session_id, CHAT_HISTORY_WINDOW)
+            ).fetchall()
+        if rows:
+            return [
+                {"timestamp": ts, "question": question, "response": response, "source_info": orjson.loads(source_info)}
+                for ts, question, response, source_info in reversed(rows)
+            ]
+    except Exception as e:
+        logger.error("Error loading local chat history: %s", e)
+
     try:
-        response = requests.get(f"{MCP_SERVER_URL}/chat_history/{session_id}")
+        # The last two shards always hold more than the window, so older shards are never read
+        response = SESSION.get(f"{MCP_SERVER_URL}/chat_history/{session_id}", params={"since": -2})
         if response.status_code == 200:
-            return response.json().get('history', [])
+            history = orjson.loads(response.content).get('history', [])[-CHAT_HISTORY_WINDOW:]
+            # The server stores raw query results; render them as text like locally saved responses
+            for entry in history:
+                if not isinstance(entry.get('response'), str):
+                    entry['response'] = orjson.dumps(entry.get('response')).decode()
+            return history
         return []
     except Exception as e:
-        logger.error(f"Error loading chat history: {e}")
+        logger.error("Error loading chat history: %s", e)
         return []
 
 def clear_chat_history(session_id):
-    """Clear chat history on server"""
+    """Clear chat history locally and on server"""
     try:
-        response = requests.delete(f"{MCP_SERVER_URL}/chat_history/{session_id}")
+        with get_chat_store_lock(), get_chat_store() as con:
+            con.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
+        response = SESSION.delete(f"{MCP_SERVER_URL}/chat_history/{session_id}")
         return response.status_code == 200
     except Exception as e:
-        logger.error(f"Error clearing chat history: {e}")
+        logger.error("Error clearing chat history: %s", e)
         return False
 
+def response_cache_key(*parts):
+    """Build an exact-match cache key from the stringified inputs of an OpenAI call"""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+def get_cached_response(key):
+    """Return a cached OpenAI response for the key, or None on a miss"""
+    cache = st.session_state.response_cache
+    if key not in cache:
+        return None
+    cache.move_to_end(key)
+    return cache[key]
+
+def cache_response(key, response):
+    """Store an OpenAI response, evicting the least recently used entry when full"""
+    cache = st.session_state.response_cache
+    cache[key] = response
+    cache.move_to_end(key)
+    if len(cache) > RESPONSE_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def iter_completion_text(stream):
+    """Yield the text deltas of a streamed chat completion"""
+    for chunk in stream:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+def summarize_history(client, previous_summary, entries):
+    """Fold recent Q&A turns into a short rolling summary of the conversation"""
+    turns = "\n".join(f"Q: {entry['question']}\nA: {entry['response'][:500]}" for entry in entries)
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "Summarize this data analysis conversation in at most 5 short sentences. Keep the files, columns, entities and figures the user may refer back to."},
+            {"role": "user", "content": f"Summary so far:\n{previous_summary or 'None'}\n\nNew turns:\n{turns}"}
+        ],
+        temperature=0.1,
+        max_tokens=200
+    )
+    return response.choices[0].message.content.strip()
+
+def refresh_history_summary():
+    """Pick up a finished background summary, if any"""
+    future = st.session_state.summary_future
+    if future is None or not future.done():
+        return
+    try:
+        st.session_state.history_summary = future.result()
+    except Exception as e:
+        logger.error("Error summarizing chat history: %s", e)
+    st.session_state.summary_future = None
+
+def schedule_history_summary():
+    """Summarize older turns in the background every HISTORY_SUMMARY_INTERVAL turns"""
+    st.session_state.turns_since_summary += 1
+    if st.session_state.turns_since_summary < HISTORY_SUMMARY_INTERVAL or st.session_state.summary_future is not None:
+        return
+    entries = st.session_state.chat_history[-st.session_state.turns_since_summary:]
+    st.session_state.summary_future = get_background_executor().submit(
+        summarize_history, get_openai_client(), st.session_state.history_summary, entries
+    )
+    st.session_state.turns_since_summary = 0
+
+def reset_history_summary(entries=None):
+    """Discard the rolling summary and any pending one; re-summarize `entries` in the background if given"""
+    if st.session_state.summary_future is not None:
+        st.session_state.summary_future.cancel()
+    st.session_state.history_summary = ""
+    st.session_state.summary_future = None
+    st.session_state.turns_since_summary = 0
+    if entries:
+        st.session_state.summary_future = get_background_executor().submit(
+            summarize_history, get_openai_client(), "", entries
+        )
+
 def format_natural_response(question, raw_result, filename, source_info=None):
-    """Convert raw MCP tool results into natural language responses using OpenAI"""
+    """Stream a natural language answer for raw MCP tool results from OpenAI, chunk by chunk"""
+    # Per-query fields are left out of the prompt so cached answers never cite another turn's query;
+    # the source attribution panel shows them for the current turn
+    prompt_source_info = {
+        key: value for key, value in (source_info or {}).items() if key not in PER_QUERY_SOURCE_FIELDS
+    }
+    cache_key = response_cache_key("format", question, raw_result, filename, prompt_source_info)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
     try:
         context = f"""
 Dataset: {filename}
 Raw Query Result: {raw_result}
 Question: {question}
 
-Source Information: {source_info}
+Source Information: {prompt_source_info}
 
 Based on the raw result above and source information, provide a clear, natural language answer to the user's question. Use the data to give specific insights and format numbers appropriately. Include source attribution when relevant.
 """
 
-        response = openai_client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": """You are a data analysis assistant. Your task is to convert raw data query results into clear, natural language answers that business users can understand.
@@ -137,14 +521,20 @@ IMPORTANT: When source information is available, mention the data source and any
                 {"role": "user", "content": context}
             ],
             temperature=0.3,
-            max_tokens=500
+            max_tokens=500,
+            stream=True
         )
 
-        return response.choices[0].message.content
+        parts = []
+        for text in iter_completion_text(response):
+            parts.append(text)
+            yield text
+
+        cache_response(cache_key, "".join(parts))
 
     except Exception as e:
-        logger.error(f"Error formatting response: {str(e)}")
-        return f"📊 Raw result: {raw_result}"
+        logger.error("Error formatting response: %s", e)
+        yield f"📊 Raw result: {raw_result}"
 
 def display_source_attribution(source_info):
     """Display source attribution information"""
@@ -169,79 +559,48 @@ def display_source_attribution(source_info):
             
             if 'result_summary' in source_info:
                 st.markdown(f"**Result Type:** `{source_info['result_summary'].get('result_type', 'Unknown')}`")
-                st.markdown(f"**Result Size:** {source_info['result_summary'].get('result_size', 0)} characters")
+                st.markdown(f"**Result Size:** {source_info['result_summary'].get('result_size', 0)} items")
 
-# Sidebar for file upload and info
-with st.sidebar:
-    st.header("📁 Multi-File Upload & Management")
-    
-    # Session info
-    st.markdown(f"**Session ID:** `{st.session_state.session_id[:8]}...`")
-    
-    # Multiple file upload
-    uploaded_files = st.file_uploader(
-        "Choose multiple CSV/Excel files", 
-        type=["csv", "xlsx", "xls"], 
-        accept_multiple_files=True
-    )
-    
-    if uploaded_files:
-        if st.button("🚀 Upload Files", key="upload_button"):
-            with st.spinner("Uploading files..."):
-                upload_result = upload_multiple_files(uploaded_files, st.session_state.session_id)
-                
-                if "error" in upload_result:
-                    st.error(upload_result["error"])
-                else:
-                    st.success(upload_result.get("message", "Files uploaded successfully!"))
-                    st.session_state.uploaded_files = upload_result.get("uploaded_files", [])
-                    
-                    # Show uploaded files info
-                    st.subheader("📋 Uploaded Files")
-                    for file_info in st.session_state.uploaded_files:
-                        st.markdown(f"**{file_info['filename']}**")
-                        st.markdown(f"- Size: {file_info['size']:,} bytes")
-                        st.markdown(f"- Rows: {file_info['row_count']:,}")
-                        st.markdown(f"- Columns: {', '.join(file_info['columns'])}")
-                        st.markdown("---")
-    
-    # File management tools
-    if uploaded_files:
-        with st.expander("🛠️ File Management Tools"):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("📂 List All Files", key="list_files"):
-                    with st.spinner("Listing files..."):
-                        result = call_mcp_tool("list_files")
-                        if "error" in result:
-                            st.error(result["error"])
-                        else:
-                            st.code(result.get("content", [{}])[0].get("text", ""), language="json")
-                            
-                            # Store source info
-                            if "source_info" in result:
-                                st.session_state.source_tracking[st.session_state.session_id] = result["source_info"]
+@st.fragment
+def file_management_tools():
+    """Render the list/describe tools; reruns only this fragment on click"""
+    with st.expander("🛠️ File Management Tools"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("📂 List All Files", key="list_files"):
+                with st.spinner("Listing files..."):
+                    result = call_mcp_tool_cached("list_files")
+                    if "error" in result:
+                        st.error(result["error"])
+                    else:
+                        st.code(result.get("content", [{}])[0].get("text", ""), language="json")
+                        
+                        # Store source info
+                        if "source_info" in result:
+                            st.session_state.source_tracking[st.session_state.session_id] = result["source_info"]
+        
+        with col2:
+            selected_file = st.selectbox(
+                "Select file for operations", 
+                st.session_state.files["filename"]
+            )
             
-            with col2:
-                selected_file = st.selectbox(
-                    "Select file for operations", 
-                    [f['filename'] for f in st.session_state.uploaded_files] if st.session_state.uploaded_files else []
-                )
-                
-                if selected_file and st.button(f"📊 Describe {selected_file}", key="desc_file"):
-                    with st.spinner(f"Describing {selected_file}..."):
-                        result = call_mcp_tool("describe_file", filename=selected_file)
-                        if "error" in result:
-                            st.error(result["error"])
-                        else:
-                            st.code(result.get("content", [{}])[0].get("text", ""), language="json")
-                            
-                            # Display source info
-                            if "source_info" in result:
-                                display_source_attribution(result["source_info"])
+            if selected_file and st.button(f"📊 Describe {selected_file}", key="desc_file"):
+                with st.spinner(f"Describing {selected_file}..."):
+                    result = call_mcp_tool_cached("describe_file", filename=selected_file)
+                    if "error" in result:
+                        st.error(result["error"])
+                    else:
+                        st.code(result.get("content", [{}])[0].get("text", ""), language="json")
+                        
+                        # Display source info
+                        if "source_info" in result:
+                            display_source_attribution(result["source_info"])
 
-    # Chat history management
+@st.fragment
+def chat_history_panel():
+    """Render chat history management; reruns only this fragment on click"""
     if st.session_state.chat_history:
         st.subheader("📝 Chat History Management")
         
@@ -249,17 +608,19 @@ with st.sidebar:
         with col1:
             if st.button("📥 Load History", key="load_history"):
                 with st.spinner("Loading chat history..."):
-                    server_history = load_chat_history(st.session_state.session_id)
-                    if server_history:
-                        st.session_state.chat_history = server_history
-                        st.success(f"Loaded {len(server_history)} messages from server")
+                    stored_history = load_chat_history(st.session_state.session_id)
+                    if stored_history:
+                        st.session_state.chat_history = stored_history
+                        reset_history_summary(stored_history)
+                        st.success(f"Loaded {len(stored_history)} messages")
                     else:
-                        st.info("No chat history found on server")
+                        st.info("No chat history found")
         
         with col2:
             if st.button("🗑️ Clear History", key="clear_history"):
                 if clear_chat_history(st.session_state.session_id):
                     st.session_state.chat_history = []
+                    reset_history_summary()
                     st.success("Chat history cleared")
                 else:
                     st.error("Failed to clear chat history")
@@ -271,117 +632,84 @@ with st.sidebar:
             st.markdown(f"**A:** {entry.get('response', 'N/A')[:200]}...")
             st.divider()
 
-# Main content area for Q&A
-st.header("💬 Enhanced Q&A with Source Attribution")
-
-if not st.session_state.uploaded_files:
-    st.info("👈 Please upload some files from the sidebar to get started.")
-else:
-    st.markdown(f"Ask natural language questions about your uploaded data. Currently analyzing **{len(st.session_state.uploaded_files)} file(s)**.")
-    
-    # Display available files
-    with st.expander("📁 Available Files", expanded=True):
-        for file_info in st.session_state.uploaded_files:
-            st.markdown(f"- **{file_info['filename']}** ({file_info['row_count']:,} rows, {len(file_info['columns'])} columns)")
-
+@st.fragment
+def qa_panel():
+    """Render the question box and answer; reruns only this fragment on Ask"""
     # Question input
     question = st.text_input("Enter your question:", placeholder="e.g., What is the average batting average? or Show me the top 5 players by total runs.", key="question_input")
 
     if st.button("🚀 Ask Question", key="ask_button") and question:
         with st.spinner("🤔 Analyzing your question and processing data..."):
             try:
-                # Generate query ID for tracking
-                query_id = str(uuid.uuid4())
-                
-                # Get available columns for context
-                available_columns = {}
-                for file_info in st.session_state.uploaded_files:
-                    available_columns[file_info['filename']] = file_info['columns']
+                # Generate query ID for tracking: a per-session counter, not a random UUID
+                st.session_state.query_counter += 1
+                query_id = f"{st.session_state.session_id[:8]}-{st.session_state.query_counter:06d}"
                 
                 # Use OpenAI to determine which MCP tool to call and how to interpret the question
-                files_context = json.dumps(available_columns, indent=2)
+                files_context = st.session_state.files_context
                 
-                # Build chat history context for follow-up questions
+                # Build chat history context for follow-up questions: rolling summary plus the last turn verbatim
+                refresh_history_summary()
                 chat_history_context = ""
+                if st.session_state.history_summary:
+                    chat_history_context += f"Conversation Summary:\n{st.session_state.history_summary}\n\n"
                 if st.session_state.chat_history:
-                    recent_entries = st.session_state.chat_history[-3:]  # Last 3 conversations
-                    chat_history_context = "Recent Conversation History:\n" + "\n".join([
-                        f"Q: {entry['question']}\nA: {entry['response'][:200]}{'...' if len(entry['response']) > 200 else ''}"
-                        for entry in recent_entries
-                    ]) + "\n\n"
-
-                context = f"""
-{chat_history_context}Question: {question}
-Available Files and Columns:
-{files_context}
-
-IMPORTANT: You must use these EXACT column names in your pandas code. Do not invent or guess column names.
-Use context from recent conversation history to understand references to previous answers, entities, or data.
-
-Available MCP tools:
-- list_files: List all uploaded CSV/Excel files with their columns
-- get_columns: Return all column names for a file
-- describe_file: Provide statistics (row count, column count, data types) for a file
-- query_data: Perform queries on data using pandas code with parameters: operation (execute, head, count, average, sum, describe), code (pandas code to execute on df), n (number of rows for head operation)
-
-For most data queries, use query_data with operation="execute" and code containing a pandas expression to evaluate on df.
-
-Respond with ONLY valid JSON, no markdown, no explanations:
-{{"tool": "query_data", "parameters": {{"filename": "file.csv", "operation": "execute", "code": "pandas expression", "query_id": "{query_id}", "session_id": "{st.session_state.session_id}", "question": "{question}"}}}}
-
-Examples:
-- "What is the average of total_runs?" -> {{"tool": "query_data", "parameters": {{"filename": "file.csv", "operation": "execute", "code": "df['total_runs'].mean()", "query_id": "{query_id}", "session_id": "{st.session_state.session_id}", "question": "{question}"}}}}
-- "Show top 5 rows" -> {{"tool": "query_data", "parameters": {{"filename": "file.csv", "operation": "execute", "code": "df.head(5).to_dict('records')", "query_id": "{query_id}", "session_id": "{st.session_state.session_id}", "question": "{question}"}}}}
-- "How many rows?" -> {{"tool": "query_data", "parameters": {{"filename": "file.csv", "operation": "count", "query_id": "{query_id}", "session_id": "{st.session_state.session_id}", "question": "{question}"}}}}
-"""
-
-                logger.info(f"Sending question to OpenAI: {question}")
-                
-                response = openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": """You are an AI that analyzes questions about data and generates MCP tool calls.
-
-CRITICAL: Respond ONLY with valid JSON. No markdown code blocks, no explanations, no extra text.
+                    entry = st.session_state.chat_history[-1]
+                    chat_history_context += f"Previous Turn:\nQ: {entry['question']}\nA: {entry['response'][:200]}{'...' if len(entry['response']) > 200 else ''}\n\n"
 
-Format: {"tool": "tool_name", "parameters": {"filename": "file.csv", ...}}
-
-For most data questions, use query_data with operation="execute" and code containing a pandas expression to evaluate on df."""},
-                        {"role": "user", "content": context}
-                    ],
-                    temperature=0.1,
-                    max_tokens=300
+                context = ROUTER_USER_TEMPLATE.substitute(
+                    files_context=files_context,
+                    chat_history_context=chat_history_context,
+                    question=question
                 )
 
-                # Parse the AI response to get tool and parameters
-                ai_response = response.choices[0].message.content.strip()
-                logger.info(f"AI Response: {ai_response}")
+                # Reuse the routing decision when the same question is asked in the same context
+                routing_cache_key = response_cache_key("route", question, files_context, chat_history_context)
+                ai_response = get_cached_response(routing_cache_key)
+
+                if ai_response is None:
+                    logger.info("Sending question to OpenAI: %s", question)
+
+                    response = get_openai_client().chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
+                            {"role": "user", "content": context}
+                        ],
+                        temperature=0.1,
+                        max_tokens=300,
+                        response_format=ROUTER_RESPONSE_FORMAT,
+                        stream=True
+                    )
+
+                    # Parse the AI response to get tool and parameters
+                    ai_response = "".join(iter_completion_text(response)).strip()
+
+                logger.info("AI Response: %s", ai_response)
                 
-                # Display AI response for debugging
-                with st.expander("🔍 Debug: AI Response", expanded=False):
-                    st.code(ai_response, language="json")
+                # Display AI response for debugging; skipped entirely unless debug output is enabled
+                if st.session_state.get("debug_open"):
+                    with st.expander("🔍 Debug: AI Response", expanded=False):
+                        st.code(ai_response, language="json")
                 
                 try:
-                    # Clean up the response - remove markdown code blocks if present
-                    if ai_response.startswith("```"):
-                        ai_response = ai_response.split("```")[1]
-                        if ai_response.startswith("json"):
-                            ai_response = ai_response[4:]
-                        ai_response = ai_response.strip()
-                    
-                    # Parse JSON
-                    tool_info = json.loads(ai_response)
-                    tool_name = tool_info["tool"]
-                    params = tool_info["parameters"]
+                    tool_call = ToolCall.model_validate_json(ai_response)
+                    cache_response(routing_cache_key, ai_response)
+                    tool_name = tool_call.tool
+                    params = {key: value for key, value in tool_call.parameters.model_dump().items() if value is not None}
+                    if tool_name == "query_data":
+                        # Tracking fields are filled in here rather than echoed back by the model
+                        params.update(query_id=query_id, session_id=st.session_state.session_id, question=question)
                     
-                    logger.info(f"Calling tool: {tool_name} with params: {params}")
+                    logger.info("Calling tool: %s with params: %s", tool_name, params)
 
                     # Call the MCP tool
-                    mcp_result = call_mcp_tool(tool_name, **params)
+                    mcp_result = call_mcp_tool_cached(tool_name, **params)
                     
-                    # Display raw result for debugging
-                    with st.expander("🔍 Debug: Raw MCP Result", expanded=False):
-                        st.code(json.dumps(mcp_result, indent=2), language="json")
+                    # Display raw result for debugging; large results are only serialized when asked for
+                    if st.session_state.get("debug_open"):
+                        with st.expander("🔍 Debug: Raw MCP Result", expanded=False):
+                            st.code(orjson.dumps(mcp_result, option=orjson.OPT_INDENT_2).decode(), language="json")
 
                     if "error" in mcp_result:
                         st.error(mcp_result["error"])
@@ -390,9 +718,10 @@ For most data questions, use query_data with operation="execute" and code contai
                         content = mcp_result.get("content", [{}])[0].get("text", "")
                         source_info = mcp_result.get("source_info", {})
                         
-                        # Format the response naturally
+                        # Format the response naturally, rendering tokens as they stream in
                         selected_file = params.get("filename", "Unknown file")
-                        natural_response = format_natural_response(question, content, selected_file, source_info)
+                        st.markdown("**💡 Answer:**")
+                        natural_response = st.write_stream(format_natural_response(question, content, selected_file, source_info))
 
                         # Add to local chat history
                         chat_entry = {
@@ -402,10 +731,11 @@ For most data questions, use query_data with operation="execute" and code contai
                             "source_info": source_info
                         }
                         st.session_state.chat_history.append(chat_entry)
+                        save_chat_entry(st.session_state.session_id, chat_entry)
+                        schedule_history_summary()
 
-                        # Display the response
-                        st.markdown("**💡 Answer:**")
-                        st.success(natural_response)
+                        # Older turns live in the local store; keep only a recent window in memory
+                        st.session_state.chat_history = st.session_state.chat_history[-CHAT_HISTORY_WINDOW:]
                         
                         # Display source attribution
                         if source_info:
@@ -419,18 +749,84 @@ For most data questions, use query_data with operation="execute" and code contai
                                     st.markdown(f"**   A:** {entry['response'][:150]}{'...' if len(entry['response']) > 150 else ''}")
                                     st.divider()
 
-                except json.JSONDecodeError as e:
-                    st.error(f"❌ Error parsing AI response as JSON: {e}")
-                    st.subheader("Raw AI Response:")
-                    st.code(ai_response)
-                    logger.error(f"JSON parse error: {str(e)}")
                 except Exception as e:
                     st.error(f"❌ Error processing tool call: {str(e)}")
-                    logger.error(f"Tool call error: {str(e)}")
+                    logger.error("Tool call error: %s", e)
 
             except Exception as e:
                 st.error(f"❌ Error processing question: {str(e)}")
-                logger.error(f"Question processing error: {str(e)}")
+                logger.error("Question processing error: %s", e)
+
+
+# Sidebar for file upload and info
+with st.sidebar:
+    st.header("📁 Multi-File Upload & Management")
+    
+    # Session info
+    st.markdown(f"**Session ID:** `{st.session_state.session_id[:8]}...`")
+    st.toggle("🐞 Show debug output", key="debug_open")
+    
+    # Multiple file upload
+    uploaded_files = st.file_uploader(
+        "Choose multiple CSV/Excel files", 
+        type=["csv", "xlsx", "xls"], 
+        accept_multiple_files=True
+    )
+    
+    if uploaded_files:
+        if st.button("🚀 Upload Files", key="upload_button"):
+            with st.spinner("Uploading files..."):
+                upload_result = upload_multiple_files(uploaded_files, st.session_state.session_id)
+                
+                if "error" in upload_result:
+                    st.error(upload_result["error"])
+                else:
+                    st.success(upload_result.get("message", "Files uploaded successfully!"))
+                    store_uploaded_files(upload_result.get("uploaded_files", []))
+
+                    # Hash file contents once so read-only tool results can be cached per version
+                    filenames = st.session_state.files["filename"]
+                    st.session_state.file_hashes = {
+                        file.name: hash_file_contents(file.getbuffer())
+                        for file in uploaded_files if file.name in filenames
+                    }
+
+                    # Describe every uploaded file in a single MCP round-trip
+                    descriptions = call_mcp_tools_batch([
+                        {"tool": "describe_file", "params": {"filename": filename}} for filename in filenames
+                    ])
+                    for filename, result in zip(filenames, descriptions):
+                        if "error" not in result:
+                            st.session_state.tool_cache[tool_cache_key("describe_file", filename)] = result
+                    
+                    # Show uploaded files info
+                    st.subheader("📋 Uploaded Files")
+                    files = st.session_state.files
+                    st.markdown("\n\n---\n\n".join(
+                        f"**{filename}**\n- Size: {size:,} bytes\n- Rows: {row_count:,}\n- Columns: {', '.join(columns)}"
+                        for filename, size, row_count, columns in zip(files["filename"], files["size"], files["row_count"], files["columns"])
+                    ))
+    
+    # File management tools
+    if uploaded_files:
+        file_management_tools()
+
+    # Chat history management
+    chat_history_panel()
+
+# Main content area for Q&A
+st.header("💬 Enhanced Q&A with Source Attribution")
+
+if not st.session_state.files["filename"]:
+    st.info("👈 Please upload some files from the sidebar to get started.")
+else:
+    st.markdown(f"Ask natural language questions about your uploaded data. Currently analyzing **{len(st.session_state.files['filename'])} file(s)**.")
+    
+    # Display available files
+    with st.expander("📁 Available Files", expanded=True):
+        st.markdown(st.session_state.files_markdown)
+
+    qa_panel()
 
 # Enhanced footer
 st.markdown("---")
@@ -438,8 +834,8 @@ col1, col2, col3 = st.columns(3)
 with col1:
     st.caption("🚀 Enhanced MCP Server v2.0.0")
 with col2:
-    st.caption(f"📊 {len(st.session_state.uploaded_files)} files loaded")
+    st.caption(f"📊 {len(st.session_state.files['filename'])} files loaded")
 with col3:
-    st.caption(f"💬 {len(st.session_state.chat_history)} interactions")
+    st.caption(f"💬 {count_chat_history(st.session_state.session_id)} interactions")
 
 st.caption("Built with Streamlit, Enhanced MCP, and OpenAI. Multi-file support, chat history, and source attribution enabled.")
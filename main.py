@@ -1,14 +1,74 @@
 import os
+import re
+import ast
+import builtins
+import importlib.util
+import weakref
+import shutil
+import asyncio
+import threading
 import pandas as pd
-from fastapi import FastAPI, HTTPException, File, UploadFile
-from typing import List, Dict, Any
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, File, UploadFile, Header, Request, Query
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+import anyio.to_thread
+from types import CodeType
+from typing import List, Dict, Any, Optional, Callable, Iterator
 import time
 import uuid
-import json
+import itertools
+import hashlib
+import orjson
+import zlib
 from functools import lru_cache
 from datetime import datetime
 
+# Upper bound on a gzip request body once decompressed, so small compressed bodies cannot inflate without limit
+MAX_DECOMPRESSED_BODY_BYTES = int(os.getenv("MAX_DECOMPRESSED_BODY_BYTES", 64 * 1024 ** 2))
+
+def decompress_gzip_body(body: bytes) -> bytes:
+    """Decompress a gzip request body, refusing to inflate it past MAX_DECOMPRESSED_BODY_BYTES"""
+    decompressor = zlib.decompressobj(wbits=31)
+    try:
+        data = decompressor.decompress(body, MAX_DECOMPRESSED_BODY_BYTES)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip request body")
+    if decompressor.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Decompressed request body is too large")
+    if not decompressor.eof:
+        raise HTTPException(status_code=400, detail="Truncated gzip request body")
+    return data
+
+class GzipRequest(Request):
+    """Request whose body is transparently decompressed when sent with Content-Encoding: gzip"""
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                body = decompress_gzip_body(body)
+            self._body = body
+        return self._body
+
+class GzipRoute(APIRoute):
+    """Route class that hands endpoints a GzipRequest"""
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def gzip_route_handler(request: Request) -> Response:
+            return await original_route_handler(GzipRequest(request.scope, request.receive))
+
+        return gzip_route_handler
+
 app = FastAPI(title="CSV_Excel_MCP_Server", description="Enhanced MCP server for CSV/Excel file operations with multi-file support")
+app.router.route_class = GzipRoute
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 DATA_DIR = "data"
 CHAT_HISTORY_DIR = "chat_history"
@@ -17,72 +77,384 @@ CHAT_HISTORY_DIR = "chat_history"
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(CHAT_HISTORY_DIR, exist_ok=True)
 
-# Cache for DataFrames with timestamps and metadata
-df_cache = {}
+# Chat history is kept per session in numbered JSONL shards, rolling over at this size
+CHAT_HISTORY_SHARD_BYTES = 16 * 1024 ** 2
+# Session IDs name files and directories under CHAT_HISTORY_DIR, so they must be one plain path component
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+# Media type for tabular query results sent as Arrow IPC instead of JSON
+ARROW_STREAM_MIME = "application/vnd.apache.arrow.stream"
+
+# Clients may reuse /tools and /resources responses briefly, revalidating with If-None-Match
+RESPONSE_CACHE_CONTROL = "private, max-age=60"
+
+# pd.read_csv's default missing-value tokens, passed to pyarrow's CSV reader so both parse nulls alike
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+# Rows serialized per chunk when streaming a resource
+RESOURCE_CHUNK_ROWS = 10_000
+
+# Uploads are copied to disk in chunks of this size rather than read fully into memory
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Cache for DataFrames, bounded by total in-memory size and expired after CACHE_TIMEOUT
 CACHE_TIMEOUT = 300  # 5 minutes
+DF_CACHE_MAX_BYTES = int(os.getenv("DF_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+CACHE_EVICTION_INTERVAL = 60  # seconds
+
+def dataframe_nbytes(df: pd.DataFrame) -> int:
+    """Size of a DataFrame as charged against the cache budget"""
+    return int(df.memory_usage(deep=True).sum())
+
+df_cache = TTLCache(maxsize=DF_CACHE_MAX_BYTES, ttl=CACHE_TIMEOUT, getsizeof=dataframe_nbytes)
+
+# Pandas work runs in worker threads; TTLCache is not thread-safe, so the caches and
+# file_metadata are only touched while holding this lock
+cache_lock = threading.Lock()
+
+# Worker threads available to run_in_threadpool for blocking pandas and file work
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", min(32, (os.cpu_count() or 1) + 4)))
 
 # Enhanced file metadata tracking
 file_metadata = {}  # file_id -> metadata
-source_tracking = {}  # query_id -> source information
-
-def get_csv_excel_files():
-    """Get list of CSV and Excel files in data directory"""
-    files = []
-    for file in os.listdir(DATA_DIR):
-        if file.endswith(('.csv', '.xlsx', '.xls')):
-            files.append(os.path.join(DATA_DIR, file))
-    return files
-
-def read_file(filename: str) -> pd.DataFrame:
-    """Read CSV or Excel file into DataFrame with caching and metadata tracking"""
-    filepath = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail=f"File {filename} not found")
+# query_id -> source information, bounded so a long-running server does not grow without limit
+SOURCE_TRACKING_MAX_QUERIES = 10_000
+SOURCE_TRACKING_TTL = 3600  # 1 hour
+source_tracking = TTLCache(maxsize=SOURCE_TRACKING_MAX_QUERIES, ttl=SOURCE_TRACKING_TTL)
+
+# Serializes chat history writes per session so concurrent queries cannot interleave appends
+# Weak values: a session's lock is dropped once no request is holding or waiting on it
+session_locks = weakref.WeakValueDictionary()  # session_id -> lock
+
+def get_session_lock(session_id: str) -> asyncio.Lock:
+    """Return the chat history lock for a session, creating it on first use"""
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    return lock
+
+def get_csv_excel_files() -> List[tuple]:
+    """Get (path, stat) for the CSV and Excel files in data directory from a single directory scan"""
+    with os.scandir(DATA_DIR) as entries:
+        return [
+            (entry.path, entry.stat())
+            for entry in entries
+            if entry.name.endswith(('.csv', '.xlsx', '.xls')) and entry.is_file()
+        ]
+
+@lru_cache(maxsize=4096)
+def resolve_path(filename: str) -> tuple:
+    """Map a filename to its path in DATA_DIR and its file type ('csv', 'excel' or None)"""
+    if filename.endswith('.csv'):
+        file_type = 'csv'
+    elif filename.endswith(('.xlsx', '.xls')):
+        file_type = 'excel'
+    else:
+        file_type = None
+    return os.path.join(DATA_DIR, filename), file_type
+
+def parquet_path(filepath: str) -> str:
+    """Path of the Parquet copy kept alongside an uploaded file"""
+    return filepath + ".parquet"
+
+def write_parquet_copy(filepath: str, df: pd.DataFrame):
+    """Persist a Parquet copy of an uploaded file so cache misses avoid CSV/Excel parsing"""
+    try:
+        df.to_parquet(parquet_path(filepath), engine='pyarrow', compression='zstd')
+    except Exception as e:
+        print(f"Error writing Parquet copy of {filepath}: {e}")
+
+def feather_path(filepath: str) -> str:
+    """Path of the uncompressed Feather copy used to serve resources via memory mapping"""
+    return filepath + ".feather"
+
+def write_feather_copy(filepath: str, df: pd.DataFrame):
+    """Persist an uncompressed Feather copy so resource reads can memory-map it without decoding"""
+    try:
+        feather.write_feather(df, feather_path(filepath), compression='uncompressed')
+    except Exception as e:
+        print(f"Error writing Feather copy of {filepath}: {e}")
+
+def iter_resource_rows(filepath: str, filename: str, offset: int, limit: Optional[int]) -> Iterator[List[Dict[str, Any]]]:
+    """Yield a slice of a file's rows in chunks, memory-mapping its Feather copy when it is up to date"""
+    feather_file = feather_path(filepath)
+    if os.path.exists(feather_file) and os.path.getmtime(feather_file) >= os.path.getmtime(filepath):
+        with pa.memory_map(feather_file) as source:
+            table = pa.ipc.open_file(source).read_all().slice(offset, limit)
+            for batch in table.to_batches(max_chunksize=RESOURCE_CHUNK_ROWS):
+                yield batch.to_pylist()
+        return
+
+    df = read_file(filename)
+    end = offset + limit if limit is not None else None
+    rows = df.iloc[offset:end]
+    for start in range(0, len(rows), RESOURCE_CHUNK_ROWS):
+        yield rows.iloc[start:start + RESOURCE_CHUNK_ROWS].to_dict('records')
+
+def encode_resource_rows(row_chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Encode row chunks as consecutive pieces of the JSON-escaped text of one rows array"""
+    first = True
+    for rows in row_chunks:
+        if not rows:
+            continue
+        chunk = dumps_json(rows)[1:-1]
+        if not first:
+            chunk = b"," + chunk
+        # Escape the chunk as the inside of a JSON string; rows end on character boundaries so chunks escape independently
+        yield dumps_json(chunk.decode())[1:-1]
+        first = False
+
+def stream_resource_json(resource_uri: str, filename: str, encoded_rows: Iterator[bytes]) -> Iterator[bytes]:
+    """Stream the resource envelope around already-encoded rows text"""
+    yield b'{"contents":[{"uri":' + dumps_json(resource_uri) + b',"mimeType":"application/json","text":"['
+    yield from encoded_rows
+    with cache_lock:
+        metadata = dict(file_metadata.get(filename, {}))
+    yield b']"}],"metadata":' + dumps_json(metadata) + b"}"
+
+def read_csv_multithreaded(filepath: str) -> pd.DataFrame:
+    """Parse a CSV with pyarrow's multithreaded reader, producing the same frame as pd.read_csv.
+
+    Falls back to pandas for anything pyarrow rejects or cannot mirror, such as duplicate headers.
+    """
+    try:
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+        convert_options = pacsv.ConvertOptions(strings_can_be_null=True, null_values=PANDAS_NA_VALUES)
+        table = pacsv.read_csv(filepath, read_options=read_options, convert_options=convert_options)
+        if len(set(table.column_names)) != table.num_columns:
+            return pd.read_csv(filepath)
+
+        # pandas leaves date and time columns as text and reads all-empty columns as float NaN;
+        # re-read any columns pyarrow inferred differently with the types pandas would produce
+        column_types = {}
+        for field in table.schema:
+            if pa.types.is_temporal(field.type):
+                column_types[field.name] = pa.string()
+            elif pa.types.is_null(field.type):
+                column_types[field.name] = pa.float64()
+        if column_types:
+            convert_options.column_types = column_types
+            table = pacsv.read_csv(filepath, read_options=read_options, convert_options=convert_options)
+
+        nullable_bool_columns = [
+            field.name for field in table.schema
+            if pa.types.is_boolean(field.type) and table.column(field.name).null_count
+        ]
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        # pandas marks missing values in boolean object columns with NaN rather than None
+        for column in nullable_bool_columns:
+            df[column] = df[column].where(df[column].notna(), float("nan"))
+        return df
+    except pa.ArrowException:
+        return pd.read_csv(filepath)
+
+def load_dataframe(filepath: str, filename: str, file_stat: Optional[os.stat_result] = None) -> pd.DataFrame:
+    """Load a file from disk, preferring an up-to-date Parquet copy over the original"""
+    file_stat = file_stat or os.stat(filepath)
+    parquet_file = parquet_path(filepath)
+    if os.path.exists(parquet_file) and os.path.getmtime(parquet_file) >= file_stat.st_mtime:
+        return pd.read_parquet(parquet_file, engine='pyarrow')
+    if filename.endswith('.csv'):
+        return read_csv_multithreaded(filepath)
+    if filename.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(filepath)
+    raise HTTPException(status_code=400, detail="Unsupported file type")
+
+def read_file(filename: str, file_stat: Optional[os.stat_result] = None) -> pd.DataFrame:
+    """Read CSV or Excel file into DataFrame with caching and metadata tracking.
+
+    The returned DataFrame is the cached instance and must be treated as read-only.
+    A stat result already obtained by the caller can be passed to avoid another stat call.
+    """
+    filepath, file_type = resolve_path(filename)
+    if file_stat is None:
+        try:
+            file_stat = os.stat(filepath)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File {filename} not found")
 
     current_time = time.time()
     cache_key = filename
 
-    # Check cache
-    if cache_key in df_cache:
-        cached_df, timestamp = df_cache[cache_key]
-        if current_time - timestamp < CACHE_TIMEOUT:
+    # Check cache; expired entries are dropped by the TTL cache itself
+    with cache_lock:
+        cached_df = df_cache.get(cache_key)
+        if cached_df is not None:
             # Update source tracking info
-            file_metadata[cache_key] = {
-                'last_accessed': current_time,
-                'file_size': os.path.getsize(filepath),
-                'file_type': 'csv' if filename.endswith('.csv') else 'excel'
-            }
+            file_metadata.setdefault(cache_key, {})['last_accessed'] = current_time
             return cached_df
-        else:
-            # Cache expired, remove it
-            del df_cache[cache_key]
 
     # Read file
     try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(filepath)
-        elif filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(filepath)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
+        df = load_dataframe(filepath, filename, file_stat)
         
-        # Cache the DataFrame with metadata
-        df_cache[cache_key] = (df.copy(), current_time)
-        
-        # Track file metadata
-        file_metadata[cache_key] = {
-            'last_accessed': current_time,
-            'file_size': os.path.getsize(filepath),
-            'file_type': 'csv' if filename.endswith('.csv') else 'excel',
-            'upload_time': current_time,
-            'columns': list(df.columns),
-            'row_count': len(df)
-        }
+        with cache_lock:
+            # Cache the DataFrame unless it alone exceeds the cache budget
+            try:
+                df_cache[cache_key] = df
+            except ValueError:
+                pass
+
+            # Track file metadata, keeping fields recorded at upload such as session_id
+            metadata = file_metadata.setdefault(cache_key, {})
+            metadata.setdefault('upload_time', current_time)
+            metadata.update({
+                'last_accessed': current_time,
+                'file_size': file_stat.st_size,
+                'file_type': file_type,
+                'columns': list(df.columns),
+                'row_count': len(df)
+            })
         
         return df
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file {filename}: {str(e)}")
 
+# Filters use numexpr's vectorized, multithreaded kernels when it is installed
+QUERY_ENGINE = "numexpr" if importlib.util.find_spec("numexpr") else "python"
+FILTER_CACHE_MAX_BYTES = int(os.getenv("FILTER_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+# (filename, filter expression) -> (weak reference to the source frame, filtered frame)
+filter_cache = TTLCache(
+    maxsize=FILTER_CACHE_MAX_BYTES, ttl=CACHE_TIMEOUT, getsizeof=lambda entry: dataframe_nbytes(entry[1])
+)
+
+def apply_filter(df: pd.DataFrame, filename: str, filter_expr: str) -> pd.DataFrame:
+    """Filter a cached frame, reusing the previous result while the source frame is unchanged"""
+    key = (filename, filter_expr)
+    with cache_lock:
+        cached = filter_cache.get(key)
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+
+    filtered = df.query(filter_expr, engine=QUERY_ENGINE)
+    with cache_lock:
+        try:
+            filter_cache[key] = (weakref.ref(df), filtered)
+        except ValueError:
+            pass  # Larger than the whole filter cache budget
+    return filtered
+
+# (filename, summary kind) -> (file mtime, summary); summaries are deterministic per file version
+describe_cache: Dict[tuple, tuple] = {}
+
+def cached_file_summary(filename: str, kind: str, compute: Callable[[], Any]) -> Any:
+    """Return a per-file summary such as describe() output, recomputing only when the file changes"""
+    mtime = os.path.getmtime(resolve_path(filename)[0])
+    key = (filename, kind)
+    with cache_lock:
+        cached = describe_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    summary = compute()
+    with cache_lock:
+        describe_cache[key] = (mtime, summary)
+    return summary
+
+def describe_columns(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Per-column dtype and non-null count for describe_file"""
+    # One vectorized count over all columns instead of a Series per column
+    counts = df.count().to_numpy()
+    return [
+        {"name": col, "dtype": str(dtype), "non_null_count": int(count)}
+        for col, dtype, count in zip(df.columns, df.dtypes, counts)
+    ]
+
+# AST nodes allowed in `execute` expressions: pandas method chains, indexing, arithmetic and lambdas
+ALLOWED_EXPRESSION_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Attribute, ast.Call, ast.keyword, ast.Subscript, ast.Slice,
+    ast.Constant, ast.Tuple, ast.List, ast.Dict, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Lambda, ast.arguments, ast.arg, ast.operator, ast.unaryop, ast.boolop, ast.cmpop
+)
+# Builtins available to `execute` expressions
+SAFE_BUILTINS = {name: getattr(builtins, name) for name in (
+    "len", "round", "min", "max", "sum", "abs", "int", "float", "str", "bool", "list", "dict", "sorted"
+)}
+# DataFrame, Series, GroupBy and accessor attributes `execute` expressions may use; anything else,
+# including module traversal such as pd.io or pd.compat, is rejected
+ALLOWED_ATTRIBUTES = {
+    # Shape and labels
+    "shape", "size", "columns", "index", "dtypes", "dtype", "name", "empty", "ndim", "values", "T",
+    # Selection
+    "loc", "iloc", "at", "iat", "head", "tail", "nlargest", "nsmallest", "sample", "filter", "where", "mask",
+    "isin", "between", "first", "last", "nth", "get_group", "groups", "ngroups",
+    # Aggregation and statistics
+    "mean", "median", "sum", "min", "max", "std", "var", "count", "nunique", "unique", "value_counts",
+    "mode", "quantile", "prod", "any", "all", "idxmax", "idxmin", "corr", "cov", "describe", "agg",
+    "aggregate", "cumsum", "cumprod", "cummax", "cummin", "diff", "pct_change", "shift", "rank",
+    "rolling", "expanding", "resample", "groupby", "pivot_table", "pivot", "melt", "stack", "unstack",
+    "transpose", "explode",
+    # Transformation
+    "sort_values", "sort_index", "reset_index", "set_index", "rename", "astype", "round", "abs", "clip",
+    "fillna", "dropna", "isna", "isnull", "notna", "notnull", "duplicated", "drop_duplicates", "drop",
+    "replace", "apply", "map", "transform", "assign", "copy",
+    # Conversion of results
+    "to_dict", "to_list", "tolist", "to_numpy", "to_frame", "item",
+    # String and datetime accessors
+    "str", "dt", "contains", "startswith", "endswith", "lower", "upper", "strip", "split", "len",
+    "year", "month", "day", "hour", "minute", "weekday", "dayofweek", "date", "quarter", "month_name",
+    "day_name",
+}
+# Methods that look up and call a method named by a string function argument, e.g. df.agg('sum')
+STRING_DISPATCH_METHODS = {"apply", "agg", "aggregate", "transform", "map"}
+
+def function_name_constants(node: ast.AST):
+    """String constants in a function argument that pandas would resolve as method names"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        yield node.value
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        for element in node.elts:
+            yield from function_name_constants(element)
+    elif isinstance(node, ast.Dict):
+        # Keys are column labels; values are the functions applied to them
+        for value in node.values:
+            yield from function_name_constants(value)
+
+def dispatched_function_names(call: ast.Call):
+    """Method names a call to apply/agg/aggregate/transform/map would dispatch to by string"""
+    if not isinstance(call.func, ast.Attribute) or call.func.attr not in STRING_DISPATCH_METHODS:
+        return
+    if call.args:
+        yield from function_name_constants(call.args[0])
+    for keyword in call.keywords:
+        if keyword.arg in ("func", "arg"):
+            yield from function_name_constants(keyword.value)
+        elif call.func.attr in ("agg", "aggregate"):
+            # Named aggregation: name=(column, func) or name=func
+            value = keyword.value
+            if isinstance(value, ast.Tuple) and value.elts:
+                value = value.elts[-1]
+            yield from function_name_constants(value)
+
+def validate_expression(tree: ast.Expression):
+    """Reject expressions outside the pandas allowlist: df, safe builtins and allowlisted attributes"""
+    allowed_names = {"df", *SAFE_BUILTINS}
+    allowed_names.update(node.arg for node in ast.walk(tree) if isinstance(node, ast.arg))
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_EXPRESSION_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in expressions")
+        if isinstance(node, ast.Name) and node.id not in allowed_names:
+            raise ValueError(f"Name '{node.id}' is not allowed in expressions")
+        if isinstance(node, ast.Attribute) and node.attr not in ALLOWED_ATTRIBUTES:
+            raise ValueError(f"Attribute '{node.attr}' is not allowed in expressions")
+        if isinstance(node, ast.Call):
+            for name in dispatched_function_names(node):
+                if name not in ALLOWED_ATTRIBUTES:
+                    raise ValueError(f"Function '{name}' is not allowed in expressions")
+
+@lru_cache(maxsize=1024)
+def compile_expression(code: str) -> CodeType:
+    """Validate and compile an `execute` expression once per distinct code string"""
+    tree = ast.parse(code, mode="eval")
+    validate_expression(tree)
+    return compile(tree, "<query>", "eval")
+
 def track_query_source(query_id: str, filename: str, operation: str, columns_used: List[str] = None):
     """Track source information for a query"""
     source_tracking[query_id] = {
@@ -94,122 +466,273 @@ def track_query_source(query_id: str, filename: str, operation: str, columns_use
         'query_result_summary': None
     }
 
-def save_chat_history(session_id: str, question: str, response: str, source_info: Dict[str, Any] = None):
-    """Save chat history to file"""
+def dumps_json(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes with orjson, including numpy values and non-string dict keys"""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def dataframe_to_arrow_stream(df: pd.DataFrame, source_info: Dict[str, Any]) -> bytes:
+    """Serialize a DataFrame as an Arrow IPC stream with source info in the schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"source_info"] = dumps_json(source_info)
+    table = table.replace_schema_metadata(metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def validate_session_id(session_id: str):
+    """Reject session IDs that are not a single safe path component, such as '.', '..' or '../data'"""
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+
+def chat_history_dir(session_id: str) -> str:
+    """Directory holding a session's chat history shards"""
+    validate_session_id(session_id)
+    session_dir = os.path.join(CHAT_HISTORY_DIR, session_id)
+    if os.path.dirname(os.path.abspath(session_dir)) != os.path.abspath(CHAT_HISTORY_DIR):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    return session_dir
+
+def chat_history_shards(session_id: str) -> List[str]:
+    """Paths of a session's chat history shards, oldest first"""
+    session_dir = chat_history_dir(session_id)
+    if not os.path.isdir(session_dir):
+        return []
+    names = [name for name in os.listdir(session_dir) if name.endswith(".jsonl")]
+    return [os.path.join(session_dir, name) for name in sorted(names, key=lambda name: int(name[:-6]))]
+
+def current_chat_history_shard(session_id: str) -> str:
+    """Shard new entries are appended to, starting a new one once the latest is full"""
+    shards = chat_history_shards(session_id)
+    if not shards:
+        index = 0
+    else:
+        index = int(os.path.basename(shards[-1])[:-6])
+        if os.path.getsize(shards[-1]) >= CHAT_HISTORY_SHARD_BYTES:
+            index += 1
+    return os.path.join(chat_history_dir(session_id), f"{index:03d}.jsonl")
+
+def migrate_legacy_chat_history(session_id: str):
+    """Move a legacy {session_id}.json or {session_id}.jsonl history file into the session's first shard"""
+    validate_session_id(session_id)
+    legacy_json = os.path.join(CHAT_HISTORY_DIR, f"{session_id}.json")
+    legacy_jsonl = os.path.join(CHAT_HISTORY_DIR, f"{session_id}.jsonl")
+    if not os.path.exists(legacy_json) and not os.path.exists(legacy_jsonl):
+        return
+
+    os.makedirs(chat_history_dir(session_id), exist_ok=True)
+    first_shard = os.path.join(chat_history_dir(session_id), "000.jsonl")
+    if os.path.exists(legacy_json):
+        with open(legacy_json, 'rb') as f:
+            history = orjson.loads(f.read())
+        with open(legacy_jsonl, 'ab') as f:
+            f.write(b"".join(dumps_json(entry) + b"\n" for entry in history))
+        os.remove(legacy_json)
+    os.replace(legacy_jsonl, first_shard)
+
+def save_chat_history(session_id: str, question: str, response: Any, source_info: Dict[str, Any] = None):
+    """Append a chat history entry to the session's current shard"""
     try:
-        history_file = os.path.join(CHAT_HISTORY_DIR, f"{session_id}.json")
-        
-        # Load existing history
-        history = []
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
+        migrate_legacy_chat_history(session_id)
+        os.makedirs(chat_history_dir(session_id), exist_ok=True)
+        history_file = current_chat_history_shard(session_id)
         
-        # Add new entry
         new_entry = {
             'timestamp': datetime.now().isoformat(),
             'question': question,
             'response': response,
             'source_info': source_info or {}
         }
-        history.append(new_entry)
         
-        # Save updated history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        try:
+            line = dumps_json(new_entry)
+        except TypeError:
+            # Results orjson cannot encode, such as tuple keys from multi-column groupbys, are kept as text
+            new_entry['response'] = str(response)
+            line = dumps_json(new_entry)
+
+        # Append only the new entry instead of rewriting the whole history
+        with open(history_file, 'ab') as f:
+            f.write(line + b"\n")
     except Exception as e:
         print(f"Error saving chat history: {e}")
 
-def get_chat_history(session_id: str) -> List[Dict[str, Any]]:
+def iter_chat_history(session_id: str, since: Optional[int] = None):
+    """Stream chat history entries for a session, one JSONL line at a time.
+
+    `since` selects shards like a slice start, so -1 reads only the latest shard.
+    """
+    migrate_legacy_chat_history(session_id)
+    shards = chat_history_shards(session_id)
+    if since is not None:
+        shards = shards[since:]
+    for history_file in shards:
+        with open(history_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+
+def get_chat_history(session_id: str, since: Optional[int] = None) -> List[Dict[str, Any]]:
     """Get chat history for a session"""
     try:
-        history_file = os.path.join(CHAT_HISTORY_DIR, f"{session_id}.json")
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                return json.load(f)
-        return []
+        return list(iter_chat_history(session_id, since))
     except Exception as e:
         print(f"Error loading chat history: {e}")
         return []
 
+def delete_chat_history(session_id: str):
+    """Remove a session's chat history shards and any legacy history files"""
+    validate_session_id(session_id)
+    shutil.rmtree(chat_history_dir(session_id), ignore_errors=True)
+    for extension in (".jsonl", ".json"):
+        history_file = os.path.join(CHAT_HISTORY_DIR, f"{session_id}{extension}")
+        if os.path.exists(history_file):
+            os.remove(history_file)
+
+def read_parquet_summary(filepath: str, file_stat: os.stat_result) -> Optional[tuple]:
+    """Columns and row count from an up-to-date Parquet copy's footer, without reading any data"""
+    parquet_file = parquet_path(filepath)
+    if not os.path.exists(parquet_file) or os.path.getmtime(parquet_file) < file_stat.st_mtime:
+        return None
+
+    parquet_metadata = pq.read_metadata(parquet_file)
+    schema = parquet_metadata.schema.to_arrow_schema()
+    # Stored index columns are listed by name; a RangeIndex is described by a dict and has no column
+    index_columns = {name for name in (schema.pandas_metadata or {}).get('index_columns', []) if isinstance(name, str)}
+    columns = [name for name in schema.names if name not in index_columns]
+    return columns, parquet_metadata.num_rows
+
+def index_data_dir():
+    """Populate file_metadata from the files already in DATA_DIR.
+
+    Columns and row counts come from Parquet footers; files without an up-to-date
+    copy are listed by size only and parsed on first use by read_file.
+    """
+    for filepath, file_stat in get_csv_excel_files():
+        filename = os.path.basename(filepath)
+        try:
+            summary = read_parquet_summary(filepath, file_stat)
+            metadata = {
+                'upload_time': file_stat.st_mtime,
+                'file_size': file_stat.st_size,
+                'file_type': resolve_path(filename)[1]
+            }
+            if summary is not None:
+                metadata['columns'], metadata['row_count'] = summary
+            with cache_lock:
+                file_metadata.setdefault(filename, {}).update(metadata)
+        except Exception as e:
+            print(f"Error indexing file {filename}: {e}")
+
+async def evict_expired_dataframes():
+    """Periodically drop expired DataFrames that are never requested again"""
+    while True:
+        await asyncio.sleep(CACHE_EVICTION_INTERVAL)
+        with cache_lock:
+            df_cache.expire()
+            filter_cache.expire()
+        source_tracking.expire()
+
+@app.on_event("startup")
+async def configure_threadpool():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def build_file_index():
+    await run_in_threadpool(index_data_dir)
+
+@app.on_event("startup")
+async def start_cache_eviction():
+    app.state.cache_eviction_task = asyncio.create_task(evict_expired_dataframes())
+
 @app.get("/")
 async def root():
     return {"message": "CSV_Excel_MCP_Server", "version": "2.0.0"}
 
-@app.get("/tools")
-async def list_tools():
-    return {
-        "tools": [
-            {
-                "name": "list_files",
-                "description": "List all uploaded CSV/Excel files with their columns.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {}
-                }
+# Tool definitions are static, so their ETag is computed once
+TOOLS = [
+    {
+        "name": "list_files",
+        "description": "List all uploaded CSV/Excel files with their columns.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {}
+        }
+    },
+    {
+        "name": "get_columns",
+        "description": "Return all column names for a given file.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "filename": {"type": "string"}
             },
-            {
-                "name": "get_columns",
-                "description": "Return all column names for a given file.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {"type": "string"}
-                    },
-                    "required": ["filename"]
-                }
+            "required": ["filename"]
+        }
+    },
+    {
+        "name": "describe_file",
+        "description": "Provide basic statistics (row count, column count, data types) for a given file.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "filename": {"type": "string"}
             },
-            {
-                "name": "describe_file",
-                "description": "Provide basic statistics (row count, column count, data types) for a given file.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {"type": "string"}
-                    },
-                    "required": ["filename"]
-                }
+            "required": ["filename"]
+        }
+    },
+    {
+        "name": "query_data",
+        "description": "Perform queries on data using pandas code with enhanced source tracking.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "filename": {"type": "string"},
+                "operation": {"type": "string"},
+                "code": {"type": "string"},
+                "query_id": {"type": "string"},
+                "session_id": {"type": "string"},
+                "question": {"type": "string"}
             },
-            {
-                "name": "query_data",
-                "description": "Perform queries on data using pandas code with enhanced source tracking.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {"type": "string"},
-                        "operation": {"type": "string"},
-                        "code": {"type": "string"},
-                        "query_id": {"type": "string"},
-                        "session_id": {"type": "string"},
-                        "question": {"type": "string"}
-                    },
-                    "required": ["filename", "operation"]
-                }
+            "required": ["filename", "operation"]
+        }
+    },
+    {
+        "name": "get_chat_history",
+        "description": "Get chat history for a specific session.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "session_id": {"type": "string"}
             },
-            {
-                "name": "get_chat_history",
-                "description": "Get chat history for a specific session.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "session_id": {"type": "string"}
-                    },
-                    "required": ["session_id"]
-                }
+            "required": ["session_id"]
+        }
+    },
+    {
+        "name": "upload_files",
+        "description": "Upload multiple CSV/Excel files at once.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "session_id": {"type": "string"}
             },
-            {
-                "name": "upload_files",
-                "description": "Upload multiple CSV/Excel files at once.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "session_id": {"type": "string"}
-                    },
-                    "required": ["session_id"]
-                }
-            }
-        ]
+            "required": ["session_id"]
+        }
     }
+]
+TOOLS_ETAG = f'"{hashlib.blake2b(dumps_json(TOOLS), digest_size=16).hexdigest()}"'
+
+@app.get("/tools")
+async def list_tools(if_none_match: str = Header(default="")):
+    if TOOLS_ETAG in if_none_match:
+        return Response(status_code=304, headers={"ETag": TOOLS_ETAG, "Cache-Control": RESPONSE_CACHE_CONTROL})
+    return Response(
+        content=dumps_json({"tools": TOOLS}),
+        media_type="application/json",
+        headers={"ETag": TOOLS_ETAG, "Cache-Control": RESPONSE_CACHE_CONTROL}
+    )
 
 @app.post("/upload")
 async def upload_files(session_id: str, files: List[UploadFile] = File(...)):
@@ -222,31 +745,49 @@ async def upload_files(session_id: str, files: List[UploadFile] = File(...)):
                 return {"error": f"File {file.filename} is not a supported format. Only CSV and Excel files are allowed."}
             
             # Save file
-            filepath = os.path.join(DATA_DIR, file.filename)
+            filepath, file_type = resolve_path(file.filename)
+            file_size = 0
             with open(filepath, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    buffer.write(chunk)
+                    file_size += len(chunk)
             
-            # Read and validate file
+            # Parse the new file once and register it directly, replacing any frame from a previous upload
             try:
-                df = read_file(file.filename)
-                file_metadata[file.filename] = {
-                    'upload_time': time.time(),
-                    'file_size': len(content),
-                    'file_type': 'csv' if file.filename.endswith('.csv') else 'excel',
-                    'columns': list(df.columns),
-                    'row_count': len(df),
-                    'session_id': session_id
-                }
+                df = await run_in_threadpool(load_dataframe, filepath, file.filename)
+                await run_in_threadpool(write_parquet_copy, filepath, df)
+                await run_in_threadpool(write_feather_copy, filepath, df)
+                upload_time = time.time()
+                with cache_lock:
+                    df_cache.pop(file.filename, None)
+                    try:
+                        df_cache[file.filename] = df
+                    except ValueError:
+                        pass
+                    file_metadata[file.filename] = {
+                        'upload_time': upload_time,
+                        'last_accessed': upload_time,
+                        'file_size': file_size,
+                        'file_type': file_type,
+                        'columns': list(df.columns),
+                        'row_count': len(df),
+                        'session_id': session_id
+                    }
                 uploaded_files.append({
                     'filename': file.filename,
-                    'size': len(content),
+                    'size': file_size,
                     'columns': list(df.columns),
                     'row_count': len(df)
                 })
             except Exception as e:
-                # Remove file if reading fails
+                # Remove file if reading fails, along with copies and cache entries from a previous upload under this name
                 os.remove(filepath)
+                for copy_path in (parquet_path(filepath), feather_path(filepath)):
+                    if os.path.exists(copy_path):
+                        os.remove(copy_path)
+                with cache_lock:
+                    df_cache.pop(file.filename, None)
+                    file_metadata.pop(file.filename, None)
                 return {"error": f"Error reading file {file.filename}: {str(e)}"}
         
         return {
@@ -257,43 +798,55 @@ async def upload_files(session_id: str, files: List[UploadFile] = File(...)):
         raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
 
 @app.get("/chat_history/{session_id}")
-async def get_history(session_id: str):
-    """Get chat history for a session"""
-    history = get_chat_history(session_id)
+async def get_history(session_id: str, since: Optional[int] = None):
+    """Get chat history for a session; `since` limits it to shards from that index (negative counts from the latest)"""
+    validate_session_id(session_id)
+    history = await run_in_threadpool(get_chat_history, session_id, since)
     return {"session_id": session_id, "history": history}
 
 @app.delete("/chat_history/{session_id}")
 async def clear_history(session_id: str):
     """Clear chat history for a session"""
     try:
-        history_file = os.path.join(CHAT_HISTORY_DIR, f"{session_id}.json")
-        if os.path.exists(history_file):
-            os.remove(history_file)
+        async with get_session_lock(session_id):
+            await run_in_threadpool(delete_chat_history, session_id)
         return {"message": f"Chat history cleared for session {session_id}"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing history: {str(e)}")
 
+@app.post("/tools/_batch")
+async def call_tools_batch(calls: List[Dict[str, Any]]):
+    """Run several tool calls in one request; each call is {"tool": name, "params": {...}}"""
+    results = []
+    for call in calls:
+        try:
+            results.append(await call_tool(call.get("tool", ""), call.get("params", {}), accept=""))
+        except HTTPException as e:
+            results.append({"error": e.detail})
+    return {"results": results}
+
 @app.post("/tools/{tool_name}")
-async def call_tool(tool_name: str, arguments: Dict[str, Any]):
+async def call_tool(tool_name: str, arguments: Dict[str, Any], accept: str = Header(default="")):
     """Enhanced tool calling with source tracking and chat history"""
     try:
         # Generate query ID for tracking
         query_id = str(uuid.uuid4())
         
         if tool_name == "list_files":
-            files_info = []
-            for filepath in get_csv_excel_files():
-                filename = os.path.basename(filepath)
-                try:
-                    df = read_file(filename)
-                    files_info.append({
-                        "filename": filename,
-                        "columns": list(df.columns),
-                        "row_count": len(df),
-                        "file_size": file_metadata.get(filename, {}).get('file_size', 0)
-                    })
-                except Exception as e:
-                    continue  # Skip files that can't be read
+            # Served from the metadata index maintained on upload/delete; no disk scan or file reads
+            with cache_lock:
+                indexed_files = list(file_metadata.items())
+            files_info = [
+                {
+                    "filename": filename,
+                    "columns": metadata.get('columns', []),
+                    "row_count": metadata.get('row_count', 0),
+                    "file_size": metadata.get('file_size', 0)
+                }
+                for filename, metadata in indexed_files
+            ]
 
             return {
                 "content": [
@@ -314,7 +867,7 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
             if not filename:
                 raise HTTPException(status_code=400, detail="filename is required")
 
-            df = read_file(filename)
+            df = await run_in_threadpool(read_file, filename)
             result = {
                 "columns": list(df.columns),
                 "column_count": len(df.columns)
@@ -343,14 +896,8 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
             if not filename:
                 raise HTTPException(status_code=400, detail="filename is required")
 
-            df = read_file(filename)
-            columns_info = []
-            for col in df.columns:
-                columns_info.append({
-                    "name": col,
-                    "dtype": str(df[col].dtype),
-                    "non_null_count": int(df[col].count())
-                })
+            df = await run_in_threadpool(read_file, filename)
+            columns_info = await run_in_threadpool(cached_file_summary, filename, "columns", lambda: describe_columns(df))
 
             result = {
                 "row_count": len(df),
@@ -390,40 +937,48 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
 
             if not filename or not operation:
                 raise HTTPException(status_code=400, detail="filename and operation are required")
+            if session_id:
+                validate_session_id(session_id)
 
-            df = read_file(filename)
+            df = await run_in_threadpool(read_file, filename)
 
             # Apply filter if provided
             if filter_expr:
                 try:
-                    df = df.query(filter_expr)
+                    df = await run_in_threadpool(apply_filter, df, filename, filter_expr)
                 except Exception as e:
                     raise HTTPException(status_code=400, detail=f"Invalid filter expression: {str(e)}")
 
             result = None
+            frame = None  # Tabular result, eligible for Arrow IPC responses
 
             if operation == "head":
-                result = df.head(n).to_dict('records')
+                frame = df.head(n)
+                result = await run_in_threadpool(frame.to_dict, 'records')
             elif operation == "average" and column:
                 if column not in df.columns:
                     raise HTTPException(status_code=400, detail=f"Column {column} not found")
-                result = float(df[column].mean())
+                result = float(await run_in_threadpool(df[column].mean))
             elif operation == "sum" and column:
                 if column not in df.columns:
                     raise HTTPException(status_code=400, detail=f"Column {column} not found")
-                result = float(df[column].sum())
+                result = float(await run_in_threadpool(df[column].sum))
 
             elif operation == "execute":
                 code = arguments.get("code")
                 if not code:
                     raise HTTPException(status_code=400, detail="code is required for execute operation")
                 try:
-                    exec_result = eval(code, {"pd": pd, "df": df})
+                    # User code may mutate in place; give it a shallow copy so the cached frame stays intact
+                    exec_result = await run_in_threadpool(
+                        eval, compile_expression(code), {"__builtins__": SAFE_BUILTINS, "df": df.copy(deep=False)}
+                    )
                     if hasattr(exec_result, 'to_dict'):
                         if isinstance(exec_result, pd.DataFrame):
-                            result = exec_result.to_dict('records')
+                            frame = exec_result
+                            result = await run_in_threadpool(exec_result.to_dict, 'records')
                         else:
-                            result = exec_result.to_dict()
+                            result = await run_in_threadpool(exec_result.to_dict)
                     else:
                         result = exec_result
                 except Exception as e:
@@ -432,7 +987,10 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
             elif operation == "count":
                 result = len(df)
             elif operation == "describe":
-                result = df.describe().to_dict()
+                if filter_expr:
+                    result = await run_in_threadpool(lambda: df.describe().to_dict())
+                else:
+                    result = await run_in_threadpool(cached_file_summary, filename, "describe", lambda: df.describe().to_dict())
             else:
                 raise HTTPException(status_code=400, detail=f"Unsupported operation: {operation}")
 
@@ -444,14 +1002,34 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
             if source_tracking.get(query_id):
                 source_tracking[query_id]['query_result_summary'] = {
                     'result_type': type(result).__name__,
-                    'result_size': len(str(result)) if result else 0
+                    'result_size': len(result) if hasattr(result, '__len__') else 1
                 }
             
             # Save to chat history if session info provided
             if session_id and question:
-                response_text = str(result)
+                # Stored structurally; orjson serializes it once when the entry is appended
                 source_info = source_tracking.get(query_id, {})
-                save_chat_history(session_id, question, response_text, source_info)
+                async with get_session_lock(session_id):
+                    await run_in_threadpool(save_chat_history, session_id, question, result, source_info)
+
+            result_source_info = {
+                "query_id": query_id,
+                "filename": filename,
+                "operation": operation,
+                "columns_used": columns_used,
+                "result_summary": source_tracking.get(query_id, {}).get('query_result_summary', {}),
+                "timestamp": datetime.now().isoformat()
+            }
+
+            # Send tabular results as Arrow IPC when the client asks for it; fall back to JSON otherwise
+            if frame is not None and ARROW_STREAM_MIME in accept:
+                try:
+                    return Response(
+                        content=await run_in_threadpool(dataframe_to_arrow_stream, frame, result_source_info),
+                        media_type=ARROW_STREAM_MIME
+                    )
+                except (pa.ArrowException, ValueError, TypeError):
+                    pass
 
             return {
                 "content": [
@@ -460,22 +1038,16 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
                         "text": str(result)
                     }
                 ],
-                "source_info": {
-                    "query_id": query_id,
-                    "filename": filename,
-                    "operation": operation,
-                    "columns_used": columns_used,
-                    "result_summary": source_tracking.get(query_id, {}).get('query_result_summary', {}),
-                    "timestamp": datetime.now().isoformat()
-                }
+                "source_info": result_source_info
             }
 
         elif tool_name == "get_chat_history":
             session_id = arguments.get("session_id")
             if not session_id:
                 raise HTTPException(status_code=400, detail="session_id is required")
+            validate_session_id(session_id)
             
-            history = get_chat_history(session_id)
+            history = await run_in_threadpool(get_chat_history, session_id)
             return {
                 "content": [
                     {
@@ -497,9 +1069,9 @@ async def call_tool(tool_name: str, arguments: Dict[str, Any]):
 async def list_resources():
     """Enhanced resource listing with metadata"""
     resources = []
-    for filepath in get_csv_excel_files():
-        filename = os.path.basename(filepath)
-        metadata = file_metadata.get(filename, {})
+    with cache_lock:
+        indexed_files = list(file_metadata.items())
+    for filename, metadata in indexed_files:
         resources.append({
             "uri": f"file://{filename}",
             "name": filename,
@@ -516,25 +1088,37 @@ async def list_resources():
     return {"resources": resources}
 
 @app.get("/resources/{resource_uri:path}")
-async def read_resource(resource_uri: str):
-    """Enhanced resource reading with source tracking"""
+async def read_resource(resource_uri: str, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=0),
+                        if_none_match: str = Header(default="")):
+    """Enhanced resource reading with source tracking; offset/limit select a slice of rows"""
     if resource_uri.startswith("file://"):
         filename = resource_uri[7:]  # Remove "file://" prefix
-        filepath = os.path.join(DATA_DIR, filename)
+        filepath = resolve_path(filename)[0]
+
+        try:
+            file_stat = os.stat(filepath)
+        except FileNotFoundError:
+            file_stat = None
+
+        if file_stat is not None:
+            # Weak ETag: the file version plus the requested slice fixes the rows, while the envelope's
+            # metadata (last_accessed, lazily indexed columns) can change without the file changing
+            etag_source = f"{filename}:{file_stat.st_mtime_ns}:{file_stat.st_size}:{offset}:{limit}"
+            etag = f'W/"{hashlib.blake2b(etag_source.encode(), digest_size=16).hexdigest()}"'
+            cache_headers = {"ETag": etag, "Cache-Control": RESPONSE_CACHE_CONTROL}
+            if etag in if_none_match:
+                return Response(status_code=304, headers=cache_headers)
 
-        if os.path.exists(filepath):
             try:
-                df = read_file(filename)
-                return {
-                    "contents": [
-                        {
-                            "uri": resource_uri,
-                            "mimeType": "application/json",
-                            "text": df.to_json(orient='records')
-                        }
-                    ],
-                    "metadata": file_metadata.get(filename, {})
-                }
+                # Read and encode the first chunk up front so read and encoding errors surface as a 500
+                # rather than a cut-off stream
+                encoded_rows = encode_resource_rows(iter_resource_rows(filepath, filename, offset, limit))
+                first_chunk = await run_in_threadpool(next, encoded_rows, b"")
+                return StreamingResponse(
+                    stream_resource_json(resource_uri, filename, itertools.chain([first_chunk], encoded_rows)),
+                    media_type="application/json",
+                    headers=cache_headers
+                )
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
@@ -555,14 +1139,18 @@ async def get_source_info(query_id: str):
 async def delete_file(filename: str):
     """Delete a file from the system"""
     try:
-        filepath = os.path.join(DATA_DIR, filename)
+        filepath = resolve_path(filename)[0]
         if os.path.exists(filepath):
             os.remove(filepath)
+            for copy_path in (parquet_path(filepath), feather_path(filepath)):
+                if os.path.exists(copy_path):
+                    os.remove(copy_path)
             # Clean up cache and metadata
-            if filename in df_cache:
-                del df_cache[filename]
-            if filename in file_metadata:
-                del file_metadata[filename]
+            with cache_lock:
+                df_cache.pop(filename, None)
+                file_metadata.pop(filename, None)
+                for kind in ("columns", "describe"):
+                    describe_cache.pop((filename, kind), None)
             return {"message": f"File {filename} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="File not found")
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def chat_history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CHAT_HISTORY_DIR", str(tmp_path))
+
+
+def test_saves_results_with_non_string_keys():
+    df = pd.DataFrame({"v": [1, 1, 2]})
+    result = df.groupby("v")["v"].sum().to_dict()
+
+    main.save_chat_history("session", "sum by v", result)
+
+    history = main.get_chat_history("session")
+    assert [entry["response"] for entry in history] == [{"1": 2, "2": 2}]
+
+
+def test_saves_unencodable_results_as_text():
+    df = pd.DataFrame({"a": [1, 1], "b": ["x", "y"], "v": [3, 4]})
+    result = df.groupby(["a", "b"])["v"].sum().to_dict()
+
+    main.save_chat_history("session", "sum by a and b", result)
+
+    history = main.get_chat_history("session")
+    assert [entry["response"] for entry in history] == [str(result)]
+
+
+@pytest.mark.parametrize("session_id", [".", "..", "../data", "a/b", ""])
+def test_rejects_session_ids_outside_history_dir(tmp_path, session_id):
+    (tmp_path / "other-session").mkdir()
+
+    with pytest.raises(HTTPException) as excinfo:
+        main.delete_chat_history(session_id)
+
+    assert excinfo.value.status_code == 400
+    assert (tmp_path / "other-session").exists()
+
+
+@pytest.mark.parametrize("session_id", [".", ".."])
+def test_clear_history_endpoint_rejects_dot_session_ids(tmp_path, session_id):
+    (tmp_path / "other-session").mkdir()
+
+    response = TestClient(main.app).delete(f"/chat_history/{session_id.replace('.', '%2E')}")
+
+    assert response.status_code == 400
+    assert (tmp_path / "other-session").exists()
+
+
+def test_query_data_rejects_session_id_outside_history_dir():
+    response = TestClient(main.app).post(
+        "/tools/query_data",
+        json={"filename": "missing.csv", "operation": "count", "session_id": "../data", "question": "q"},
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from main import read_csv_multithreaded
+
+
+@pytest.mark.parametrize("content", [
+    # ISO dates and timestamps stay text, as pandas leaves them
+    "d,ts,n\n2024-01-15,2024-01-15T10:00:00,1\n2024-01-16,2024-01-16 11:00,2\n,,3\n",
+    # Empty fields and pandas' null tokens are missing values in string, numeric and boolean columns
+    "name,score,flag\nalice,1.5,True\n,,False\nN/A,NA,\nnull,2.0,True\n",
+    # Quoted delimiters and all-null columns
+    'id,label,empty\n1,"x, y",\n2,z,\n',
+    # Duplicate headers fall back to pandas' renaming
+    "a,a,b\n1,2,3\n",
+])
+def test_matches_pandas_read_csv(tmp_path, content):
+    path = tmp_path / "data.csv"
+    path.write_text(content)
+
+    pd.testing.assert_frame_equal(read_csv_multithreaded(str(path)), pd.read_csv(path))
+
+
+def test_date_filter_compares_as_text(tmp_path):
+    path = tmp_path / "dates.csv"
+    path.write_text("d,v\n2024-01-14,1\n2024-01-16,2\n")
+
+    df = read_csv_multithreaded(str(path))
+
+    assert df.query('d > "2024-01-15"')["v"].tolist() == [2]
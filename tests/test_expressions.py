@@ -0,0 +1,38 @@
+import pytest
+
+from main import compile_expression
+
+
+@pytest.mark.parametrize("code", [
+    "pd.io.common.os.system('echo PWNED')",
+    "pd.compat.os.getcwd()",
+    "pd.core.frame.DataFrame",
+    "df.pipe(lambda pd: pd.io)",
+    "df.__class__.__init__.__globals__",
+    "df.to_csv('out.csv')",
+    "df.eval('a + 1')",
+    "__import__('os')",
+    "df.to_string('/tmp/x')",
+    "df.apply('to_pickle', path='/tmp/x.pkl')",
+    "df.agg(func='to_pickle', path='/tmp/x.pkl')",
+    "df.aggregate(['sum', 'to_csv'])",
+    "df.transform({'a': 'to_pickle'})",
+    "df['a'].map('to_pickle')",
+    "df.groupby('a').agg(out=('b', 'to_csv'))",
+])
+def test_rejects_expressions_outside_allowlist(code):
+    with pytest.raises(ValueError):
+        compile_expression(code)
+
+
+@pytest.mark.parametrize("code", [
+    "df['total_runs'].mean()",
+    "df.groupby('team')['total_runs'].sum().to_dict()",
+    "len(df[df['name'].str.contains('a')])",
+    "df.apply(lambda row: row['a'] * 2, axis=1)",
+    "df.groupby('team').agg({'total_runs': ['sum', 'mean']})",
+    "df.groupby('team').agg(total=('total_runs', 'sum'))",
+    "df.apply(lambda row: row['a'], axis=1, result_type='expand')",
+])
+def test_allows_pandas_expressions_on_df(code):
+    compile_expression(code)
@@ -0,0 +1,22 @@
+import gzip
+
+from fastapi.testclient import TestClient
+
+import main
+
+GZIP_JSON_HEADERS = {"Content-Encoding": "gzip", "Content-Type": "application/json"}
+
+
+def test_accepts_gzip_body():
+    response = TestClient(main.app).post("/tools/_batch", content=gzip.compress(b"[]"), headers=GZIP_JSON_HEADERS)
+
+    assert response.json() == {"results": []}
+
+
+def test_rejects_body_that_inflates_past_limit(monkeypatch):
+    monkeypatch.setattr(main, "MAX_DECOMPRESSED_BODY_BYTES", 1024)
+    bomb = gzip.compress(b"[" + b" " * 10_000_000 + b"]")
+
+    response = TestClient(main.app).post("/tools/_batch", content=bomb, headers=GZIP_JSON_HEADERS)
+
+    assert response.status_code == 413